@@ -1,27 +1,42 @@
 """
 Voice AI Feedback Agent for Automobile Servicing
-Uses LiveKit framework with STT → LLM → TTS pipeline
+Uses LiveKit framework with STT → TTS pipeline (acknowledgments are scripted, no LLM)
 Converses in Hinglish (Hindi + English mix)
 """
 
 import os
-import json
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+import re
 import uuid
+import time
+import random
 import asyncio
+import functools
+import hashlib
+import struct
+import aiohttp
 from datetime import datetime
 from typing import Optional
-import pytz
+from zoneinfo import ZoneInfo
+import orjson
+from rapidfuzz import process
+from rapidfuzz.distance import DamerauLevenshtein
 
 from livekit import rtc
 from livekit.agents import (
     AutoSubscribe,
     JobContext,
+    JobProcess,
+    StopResponse,
     WorkerOptions,
     cli,
     llm,
     voice,
 )
-from livekit.plugins import openai, deepgram, elevenlabs
+from livekit.plugins import deepgram, elevenlabs
 from dotenv import load_dotenv
 
 # Import ChatContext and ChatMessage from llm module
@@ -33,10 +48,68 @@ VoiceAgent = voice.Agent
 # Load environment variables
 load_dotenv()
 
+# Per-turn details are logged at DEBUG; set LOG_LEVEL=DEBUG in .env to see them.
+logger = logging.getLogger("feedback-agent")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+if not isinstance(logging.getLevelName(LOG_LEVEL), int):
+    LOG_LEVEL = "INFO"
+    logger.warning("⚠️ Unknown LOG_LEVEL %r, using INFO", os.getenv("LOG_LEVEL"))
+logger.setLevel(LOG_LEVEL)
+
+# Started per worker process by setup_log_queue()
+log_listener: Optional[QueueListener] = None
+
+
+def setup_log_queue():
+    """
+    Route agent logs through a queue so handler I/O happens on a background thread,
+    not the event loop. The listener forwards to the root handlers LiveKit configured,
+    so output keeps its level, timestamp and production formatting.
+    """
+    global log_listener
+    if log_listener is not None:
+        return
+    log_queue = queue.SimpleQueue()
+    log_listener = QueueListener(log_queue, *logging.getLogger().handlers, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+    logger.addHandler(QueueHandler(log_queue))
+    logger.propagate = False
+
+# Timezone used for all output timestamps
+IST = ZoneInfo("Asia/Kolkata")
+
+# Transcripts below this STT confidence are re-asked instead of parsed
+MIN_TRANSCRIPT_CONFIDENCE = 0.4
+# Re-asks per question before the answer is taken as heard (or left at its default)
+MAX_RETRIES = 2
+# Transcripts without any word character (empty or punctuation only) carry no answer
+WORD_CHAR_PATTERN = re.compile(r"\w")
+
 # =============================================================================
 # CONVERSATION STATE MANAGEMENT
 # =============================================================================
 
+def new_call_id() -> str:
+    """
+    Time-ordered UUIDv7 call ID, so files in ./out sort chronologically.
+    Uses uuid.uuid7() where available (Python 3.14+), otherwise builds one
+    from the millisecond clock and non-cryptographic random bits.
+    """
+    if hasattr(uuid, "uuid7"):
+        return str(uuid.uuid7())
+    timestamp_ms = time.time_ns() // 1_000_000
+    rand = random.getrandbits(74)
+    value = (
+        (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80
+        | 0x7 << 76                    # version 7
+        | (rand >> 62) << 64           # 12 random bits
+        | 0b10 << 62                   # RFC 4122 variant
+        | (rand & ((1 << 62) - 1))     # 62 random bits
+    )
+    return str(uuid.UUID(int=value))
+
+
 class ConversationState:
     """Manages the conversation flow and tracks answers"""
     
@@ -68,49 +141,91 @@ class ConversationState:
             "type": "free_text"
         }
     ]
+    # Flattened per-field lookups for the per-turn accessors
+    _Q_TEXT = tuple(q["text"] for q in QUESTIONS)
+    _Q_ID = tuple(q["id"] for q in QUESTIONS)
+    _Q_TYPE = tuple(q["type"] for q in QUESTIONS)
+    _N = len(QUESTIONS)
+    
+    GREETING = "Namaste! Main TVS service center se Riya bol rahi hoon. Aaj main aapka feedback lena chahti hoon. Kya aap 2 minute de sakte hain?"
+    FAREWELL_DECLINED = "Koi baat nahi, phir kabhi. Dhanyavaad!"
+    FAREWELL_COMPLETE = "Bahut bahut dhanyavaad aapka feedback dene ke liye! Aap ka din shubh rahe!"
+    FAREWELL_NO_RESPONSE = "Lagta hai aapki awaaz nahi aa rahi. Hum aapse baad mein baat karenge. Dhanyavaad!"
+    RETRY_PROMPT = "Maaf kijiye, samajh nahi aaya. Dobara bataiye?"
+    
+    DEFAULT_ANSWERS = {
+        "q1_overall_rating_1to5": 0,
+        "q2_washing_yesno": "unknown",
+        "q3_advisor_behavior_1to5": 0,
+        "q4_promised_time_yesno": "unknown",
+        "q5_additional_comments_text": ""
+    }
+    
+    # Released states kept for reuse by later calls in this worker process
+    _POOL: list = []
     
     def __init__(self):
-        self.call_id = str(uuid.uuid4())
+        self.answers: dict = {}
+        self.transcript_speakers: list = []
+        self.transcript_texts: list = []
+        self._reset()
+    
+    def _reset(self):
+        """Start a new call, keeping the existing containers"""
+        self.call_id = new_call_id()
         self.current_question_index = -1  # Start before first question (greeting)
-        self.answers = {
-            "q1_overall_rating_1to5": 0,
-            "q2_washing_yesno": "unknown",
-            "q3_advisor_behavior_1to5": 0,
-            "q4_promised_time_yesno": "unknown",
-            "q5_additional_comments_text": ""
-        }
-        self.transcript = []
+        self.answers.update(self.DEFAULT_ANSWERS)
+        self.transcript_speakers.clear()
+        self.transcript_texts.clear()
         self.conversation_complete = False
+        self.retry_count = 0  # Re-asks of the current question
+    
+    @classmethod
+    def acquire(cls) -> "ConversationState":
+        """Get a fresh state, reusing a released one when available"""
+        try:
+            return cls._POOL.pop()
+        except IndexError:
+            return cls()
+    
+    def release(self):
+        """Reset this state in place and return it to the pool"""
+        self._reset()
+        self._POOL.append(self)
         
     def get_greeting(self) -> str:
         """Initial greeting message"""
-        return "Namaste! Main TVS service center se Riya bol rahi hoon. Aaj main aapka feedback lena chahti hoon. Kya aap 2 minute de sakte hain?"
+        return self.GREETING
+    
+    @classmethod
+    def get_static_prompts(cls) -> list:
+        """All fixed lines Riya speaks, used to pre-synthesize TTS audio"""
+        return [cls.GREETING, *cls._Q_TEXT, cls.FAREWELL_DECLINED, cls.FAREWELL_COMPLETE,
+                cls.FAREWELL_NO_RESPONSE, cls.RETRY_PROMPT]
     
     def get_current_question(self) -> Optional[str]:
         """Get the current question text"""
-        if self.current_question_index < 0 or self.current_question_index >= len(self.QUESTIONS):
-            return None
-        return self.QUESTIONS[self.current_question_index]["text"]
+        index = self.current_question_index
+        return self._Q_TEXT[index] if 0 <= index < self._N else None
     
     def move_to_next_question(self) -> bool:
         """Move to next question. Returns True if more questions exist."""
         self.current_question_index += 1
-        if self.current_question_index >= len(self.QUESTIONS):
+        self.retry_count = 0
+        if self.current_question_index >= self._N:
             self.conversation_complete = True
             return False
         return True
     
     def get_current_question_id(self) -> Optional[str]:
         """Get current question ID for storing answer"""
-        if self.current_question_index < 0 or self.current_question_index >= len(self.QUESTIONS):
-            return None
-        return self.QUESTIONS[self.current_question_index]["id"]
+        index = self.current_question_index
+        return self._Q_ID[index] if 0 <= index < self._N else None
     
     def get_current_question_type(self) -> Optional[str]:
         """Get current question type for parsing"""
-        if self.current_question_index < 0 or self.current_question_index >= len(self.QUESTIONS):
-            return None
-        return self.QUESTIONS[self.current_question_index]["type"]
+        index = self.current_question_index
+        return self._Q_TYPE[index] if 0 <= index < self._N else None
     
     def store_answer(self, answer):
         """Store the answer for current question"""
@@ -119,123 +234,193 @@ class ConversationState:
             self.answers[question_id] = answer
     
     def add_to_transcript(self, speaker: str, text: str):
-        """Add message to transcript"""
-        self.transcript.append(f"{speaker}: {text}")
+        """Add message to transcript (formatted only when saved)"""
+        self.transcript_speakers.append(speaker)
+        self.transcript_texts.append(text)
 
 
 # =============================================================================
 # ANSWER EXTRACTION UTILITIES
 # =============================================================================
 
+# Enhanced pattern matching for Hinglish numbers (both Devanagari and romanized)
+ENGLISH_NUMBER_WORDS = {
+    '5': 5, 'five': 5, 'fiv': 5,
+    '4': 4, 'four': 4, 'for': 4,
+    '3': 3, 'three': 3, 'tree': 3,
+    '2': 2, 'two': 2, 'too': 2, 'tu': 2,
+    '1': 1, 'one': 1, 'won': 1,
+}
+# Hinglish with phonetic variations (romanized and Devanagari)
+HINDI_NUMBER_WORDS = {
+    'paanch': 5, 'panch': 5, 'paanj': 5, 'punch': 5,
+    'chaar': 4, 'char': 4, 'caar': 4,
+    'teen': 3, 'tin': 3, 'tean': 3, 'tina': 3,
+    'do': 2, 'dho': 2,
+    'ek': 1, 'aek': 1, 'eak': 1,
+    # Devanagari
+    'पांच': 5, 'पाँच': 5,
+    'चार': 4,
+    'तीन': 3,
+    'दो': 2,
+    'एक': 1
+}
+NUMBER_MAPPING = {**ENGLISH_NUMBER_WORDS, **HINDI_NUMBER_WORDS}
+# Number words that may appear inside a longer token (e.g. "paanchon"). Two-letter words
+# are left out: "ek", "do" and "tu" occur inside "theek", "dono" and "actually".
+NUMBER_SUBSTRINGS = [(k, v) for k, v in NUMBER_MAPPING.items() if len(k) > 2]
+# Short Hindi number words eligible for edit-distance matching, bucketed by the word
+# lengths they can be within one edit of. English number words are left out since STT
+# spells them correctly and their neighbours are ordinary words ("door" -> "four"), and
+# two-letter words are never fuzzy matched ("ok" or "ke" are one edit away from "ek").
+NUMBER_FUZZY_KEYS = {
+    length: [k for k in HINDI_NUMBER_WORDS if 1 < len(k) <= 4 and abs(len(k) - length) <= 1]
+    for length in range(3, 5)
+}
+# Punctuation STT attaches to words ("5.", "teen,")
+TOKEN_PUNCTUATION = ".,!?।"
+
+# Expanded Hinglish yes indicators (both Devanagari and romanized)
+YES_WORDS = [
+    'yes', 'yeah', 'yep', 'yup',
+    'haan', 'ha', 'han', 'hun', 'haa', 'haanji', 'hanji',
+    'bilkul', 'bilkool',
+    'ji', 'jee', 'ji han', 'ji haan',
+    'theek', 'thik', 'teek', 'tick',
+    'sahi', 'sahe', 'saahi',
+    'okay', 'ok', 'sure', 'achha', 'acha', 'accha',
+    'हां', 'हाँ', 'जी', 'बिल्कुल', 'ठीक', 'सही', 'अच्छा'  # Devanagari
+]
+# Expanded Hinglish no indicators (both Devanagari and romanized)
+NO_WORDS = [
+    'no', 'nope', 'nah', 'na',
+    'nahi', 'nahin', 'nai', 'nay', 'nehi', 'nahe',
+    'bilkul nahi', 'bilkool nahi', 'ji nahi', 'ji nahin',
+    'नहीं', 'ना', 'नाही', 'बिलकुल नहीं', 'बिल्कुल नहीं', 'जी नहीं'  # Devanagari
+]
+
+
+def compile_keywords(words, flags=0):
+    """
+    Compile keywords into a single alternation regex.
+    Keywords must start a word. Words longer than 2 characters may also begin a
+    longer compound word; very short words must stand alone to avoid false positives.
+    """
+    alternatives = []
+    # Longest first so phrases like "bilkul nahi" win over "bilkul"
+    for word in sorted(set(words), key=len, reverse=True):
+        escaped = re.escape(word)
+        if len(word) > 2:
+            alternatives.append(rf"(?<!\S){escaped}")
+        else:
+            alternatives.append(rf"(?<!\S){escaped}(?=[\s.,!?।]|$)")
+    return re.compile("|".join(alternatives), flags)
+
+
+YES_NO_MAPPING = {word: "yes" for word in YES_WORDS}
+YES_NO_MAPPING.update({word: "no" for word in NO_WORDS})
+YES_NO_PATTERN = compile_keywords(YES_NO_MAPPING)
+
+# Words that mean the user agrees to give feedback (both Devanagari and romanized Hinglish)
+AGREE_WORDS = [
+    'haan', 'han', 'haa', 'yes', 'yeah', 'yep', 'yup',
+    'bilkul', 'bilkool', 'sure', 'ok', 'okay',
+    'theek', 'thik', 'ha', 'ji', 'jee', 'achha', 'acha', 'accha',
+    'हां', 'हाँ', 'जी', 'बिल्कुल', 'ठीक', 'अच्छा'  # Devanagari
+]
+AGREE_PATTERN = compile_keywords(AGREE_WORDS, re.IGNORECASE)
+
+# Phrases that mean the user has no additional comments
+NO_COMMENT_PHRASES = ['nahi', 'nothing', 'kuch nahi', 'no comment', 'bas itna hi']
+NO_COMMENT_PATTERN = compile_keywords(NO_COMMENT_PHRASES)
+
+
 class AnswerExtractor:
     """Extracts structured answers from user responses"""
     
     @staticmethod
     def extract_rating(text: str, llm_context=None) -> int:
         """Extract rating (1-5) from user response"""
-        # Enhanced pattern matching for Hinglish numbers (both Devanagari and romanized)
-        number_mapping = {
-            # English
-            '5': 5, 'five': 5, 'fiv': 5,
-            '4': 4, 'four': 4, 'for': 4,
-            '3': 3, 'three': 3, 'tree': 3,
-            '2': 2, 'two': 2, 'too': 2, 'tu': 2,
-            '1': 1, 'one': 1, 'won': 1,
-            # Hinglish with phonetic variations (romanized)
-            'paanch': 5, 'panch': 5, 'paanj': 5, 'punch': 5,
-            'chaar': 4, 'char': 4, 'caar': 4,
-            'teen': 3, 'tin': 3, 'tean': 3, 'tina': 3,
-            'do': 2, 'dho': 2,
-            'ek': 1, 'aek': 1, 'eak': 1,
-            # Devanagari
-            'पांच': 5, 'पाँच': 5,
-            'चार': 4,
-            'तीन': 3,
-            'दो': 2,
-            'एक': 1
-        }
+        words = [word.strip(TOKEN_PUNCTUATION) for word in text.lower().split()]
         
-        text_lower = text.lower()
-        words = text_lower.split()
+        # Direct match
+        for word in words:
+            value = NUMBER_MAPPING.get(word)
+            if value:
+                return value
         
-        # Check each word and its variations
+        # Check if a word contains a number word (handles suffixes like "paanchon")
         for word in words:
-            # Direct match
-            if word in number_mapping:
-                return number_mapping[word]
-            
-            # Fuzzy matching for phonetic variations
-            for num_word, value in number_mapping.items():
-                # Check if the word contains the number word (handles typos/variations)
-                if len(num_word) > 1 and num_word in word:
+            for num_word, value in NUMBER_SUBSTRINGS:
+                if num_word in word:
                     return value
-                # Check similarity for very short words (edit distance = 1)
-                if len(word) <= 4 and len(num_word) <= 4:
-                    if sum(c1 != c2 for c1, c2 in zip(word, num_word)) <= 1:
-                        return value
+        
+        # Fuzzy matching for phonetic variations of short words (edit distance = 1)
+        for word in words:
+            candidates = NUMBER_FUZZY_KEYS.get(len(word))
+            if candidates:
+                match = process.extractOne(
+                    word, candidates,
+                    scorer=DamerauLevenshtein.distance, score_cutoff=1,
+                )
+                if match:
+                    return NUMBER_MAPPING[match[0]]
         
         return 0
     
     @staticmethod
     def extract_yes_no(text: str) -> str:
         """Extract yes/no from user response"""
-        text_lower = text.lower()
-        
-        # Expanded Hinglish yes indicators (both Devanagari and romanized)
-        yes_words = [
-            'yes', 'yeah', 'yep', 'yup',
-            'haan', 'ha', 'han', 'hun', 'haa', 'haanji', 'hanji',
-            'bilkul', 'bilkool',
-            'ji', 'jee', 'ji han', 'ji haan',
-            'theek', 'thik', 'teek', 'tick',
-            'sahi', 'sahe', 'saahi',
-            'okay', 'ok', 'sure', 'achha', 'acha', 'accha',
-            'हां', 'हाँ', 'जी', 'बिल्कुल', 'ठीक', 'सही', 'अच्छा'  # Devanagari
-        ]
-        # Expanded Hinglish no indicators (both Devanagari and romanized)
-        no_words = [
-            'no', 'nope', 'nah', 'na',
-            'nahi', 'nahin', 'nai', 'nay', 'nehi', 'nahe',
-            'bilkul nahi', 'bilkool nahi',
-            'नहीं', 'ना', 'नाही', 'बिलकुल नहीं'  # Devanagari
-        ]
-        
-        # Split text into words for better matching
-        words = text_lower.split()
-        
-        # Check for Hindi/Hinglish variations with word boundary checking
-        for word in words:
-            # Check exact word matches
-            if word in yes_words:
-                return "yes"
-            if word in no_words:
-                return "no"
-            
-            # Check partial matches for compound words
-            for yes_word in yes_words:
-                if yes_word in word and len(yes_word) > 2:  # Avoid matching very short words
-                    return "yes"
-            for no_word in no_words:
-                if no_word in word and len(no_word) > 2:
-                    return "no"
-        
+        # The earliest indicator in the utterance decides the answer
+        match = YES_NO_PATTERN.search(text.lower())
+        if match:
+            return YES_NO_MAPPING[match.group()]
         return "unknown"
     
+    @staticmethod
+    def extract_agreement(text: str) -> bool:
+        """Check if the user agrees to give feedback"""
+        # A leading refusal ("No thanks") wins over agree words found later
+        return bool(AGREE_PATTERN.search(text)) and AnswerExtractor.extract_yes_no(text) != "no"
+    
     @staticmethod
     def extract_free_text(text: str) -> str:
         """Extract free text response"""
         # Clean up the text
         text = text.strip()
         
-        # Check for "no comment" type responses
-        no_comment_phrases = ['nahi', 'nothing', 'kuch nahi', 'no comment', 'bas itna hi']
-        for phrase in no_comment_phrases:
-            if phrase in text.lower() and len(text) < 50:
-                return "No additional comments"
+        # Check for short "no comment" type responses
+        if len(text) < 50 and NO_COMMENT_PATTERN.search(text.lower()):
+            return "No additional comments"
         
         return text if text else "No response"
 
 
+# Extractor to run for each question type
+ANSWER_EXTRACTORS = {
+    "rating_1_5": AnswerExtractor.extract_rating,
+    "yes_no": AnswerExtractor.extract_yes_no,
+    "free_text": AnswerExtractor.extract_free_text,
+}
+
+
+@functools.singledispatch
+def content_to_text(content) -> str:
+    """Convert chat message content to plain text"""
+    return str(content)
+
+
+@content_to_text.register
+def _(content: str) -> str:
+    return content
+
+
+@content_to_text.register
+def _(content: list) -> str:
+    # Content is a list of strings - join them
+    return ' '.join(map(str, content))
+
+
 # =============================================================================
 # FILE MANAGEMENT
 # =============================================================================
@@ -244,42 +429,162 @@ class OutputManager:
     """Manages saving transcript and JSON output"""
     
     @staticmethod
-    def save_transcript(call_id: str, transcript: list):
+    def get_timestamp() -> str:
+        """Current IST timestamp as used in the output files"""
+        return datetime.now(IST).strftime('%Y-%m-%d %H:%M:%S')
+    
+    @staticmethod
+    def get_transcript_path(call_id: str) -> str:
+        """Path of the transcript file for a call"""
+        return f"./out/{call_id}.txt"
+    
+    @staticmethod
+    def save_transcript(call_id: str, speakers: list, texts: list, timestamp: Optional[str] = None):
         """Save conversation transcript to file"""
         os.makedirs("out", exist_ok=True)
-        filepath = f"./out/{call_id}.txt"
+        filepath = OutputManager.get_transcript_path(call_id)
         
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(f"TVS Service Center Feedback Call\n")
-            f.write(f"Call ID: {call_id}\n")
-            f.write(f"Timestamp: {datetime.now(pytz.timezone('Asia/Kolkata')).strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write("=" * 60 + "\n\n")
-            
-            for line in transcript:
-                f.write(line + "\n")
+        header = (
+            f"TVS Service Center Feedback Call\n"
+            f"Call ID: {call_id}\n"
+            f"Timestamp: {timestamp or OutputManager.get_timestamp()}\n"
+            + "=" * 60 + "\n\n"
+        )
+        
+        # Single buffered write for the whole file
+        with open(filepath, "w", encoding="utf-8", buffering=1 << 16) as f:
+            f.write(header + "\n".join(f"{s}: {t}" for s, t in zip(speakers, texts)) + "\n")
         
         return filepath
     
     @staticmethod
-    def save_json(call_id: str, answers: dict, transcript_path: str):
+    def save_json(call_id: str, answers: dict, transcript_path: str, timestamp: Optional[str] = None):
         """Save structured JSON output"""
         os.makedirs("out", exist_ok=True)
         filepath = f"./out/{call_id}.json"
         
         output = {
             "call_id": call_id,
-            "timestamp_ist": datetime.now(pytz.timezone('Asia/Kolkata')).strftime('%Y-%m-%d %H:%M:%S'),
+            "timestamp_ist": timestamp or OutputManager.get_timestamp(),
             "language": "hinglish",
             "answers": answers,
             "transcript_path": transcript_path
         }
         
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(output, f, indent=2, ensure_ascii=False)
+        # orjson writes UTF-8 directly, so Hindi text is stored unescaped
+        with open(filepath, "wb") as f:
+            f.write(orjson.dumps(output, option=orjson.OPT_INDENT_2))
         
         return filepath
 
 
+# =============================================================================
+# TTS AUDIO CACHE
+# =============================================================================
+
+# Pre-synthesized audio frames for the fixed prompts, loaded once per worker process
+TTS_CACHE: dict = {}
+
+# ElevenLabs voice settings - also part of the on-disk cache key
+TTS_VOICE_ID = "EXAVITQu4vr4xnSDxMaL"  # Bella - Soft female voice with clear pronunciation
+TTS_MODEL = "eleven_turbo_v2_5"
+
+# Synthesized prompts are kept on disk so each new worker process only loads them
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "./tts_cache")
+# Length of the frames cached audio is replayed in
+TTS_FRAME_MS = 100
+
+# Upper bound for pre-synthesis, kept under LiveKit's process initialization timeout
+TTS_WARM_TIMEOUT = 8.0
+
+
+def create_tts(**kwargs):
+    """Configure TTS (ElevenLabs with female voice - Bella for better punctuation)"""
+    return elevenlabs.TTS(voice_id=TTS_VOICE_ID, model=TTS_MODEL, **kwargs)
+
+
+def get_tts_cache_path(text: str) -> str:
+    """On-disk cache file for a prompt, keyed by voice, model and text"""
+    key = hashlib.sha256(f"{TTS_VOICE_ID}\0{TTS_MODEL}\0{text}".encode("utf-8")).hexdigest()
+    return os.path.join(TTS_CACHE_DIR, f"{key}.pcm")
+
+
+def load_cached_audio(text: str) -> Optional[list]:
+    """Load a prompt's audio frames from disk, or None if it was never synthesized"""
+    try:
+        with open(get_tts_cache_path(text), "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    
+    # 8-byte header (sample rate, channels) followed by 16-bit PCM
+    sample_rate, num_channels = struct.unpack_from("<II", data)
+    pcm = data[8:]
+    step = sample_rate * TTS_FRAME_MS // 1000 * num_channels * 2
+    return [
+        rtc.AudioFrame(
+            data=pcm[i:i + step],
+            sample_rate=sample_rate,
+            num_channels=num_channels,
+            samples_per_channel=len(pcm[i:i + step]) // (2 * num_channels),
+        )
+        for i in range(0, len(pcm), step)
+    ] or None
+
+
+def save_cached_audio(text: str, frames: list):
+    """Write a prompt's audio frames to disk for later worker processes"""
+    header = struct.pack("<II", frames[0].sample_rate, frames[0].num_channels)
+    pcm = b"".join(bytes(frame.data) for frame in frames)
+    os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+    
+    # Write then rename, so concurrent processes never read a partial file
+    path = get_tts_cache_path(text)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header + pcm)
+    os.replace(tmp_path, path)
+
+
+async def synthesize_prompt(tts, text: str):
+    """Synthesize one prompt into the cache"""
+    try:
+        async with tts.synthesize(text) as stream:
+            frames = [audio.frame async for audio in stream]
+        if frames:
+            save_cached_audio(text, frames)
+            TTS_CACHE[text] = frames
+    except Exception as e:
+        logger.warning("⚠️ Could not pre-synthesize prompt: %s", e)
+
+
+async def warm_tts_cache():
+    """Load the static prompts from disk, synthesizing only those not cached yet"""
+    missing = []
+    for text in ConversationState.get_static_prompts():
+        frames = load_cached_audio(text)
+        if frames:
+            TTS_CACHE[text] = frames
+        else:
+            missing.append(text)
+    if not missing:
+        return
+    
+    # Runs outside any job, so the plugin gets its own HTTP session
+    async with aiohttp.ClientSession() as http_session:
+        tts = create_tts(http_session=http_session)
+        try:
+            await asyncio.gather(*(synthesize_prompt(tts, text) for text in missing))
+        finally:
+            await tts.aclose()
+
+
+async def replay_frames(frames: list):
+    """Yield cached audio frames for session.say"""
+    for frame in frames:
+        yield frame
+
+
 # =============================================================================
 # CUSTOM VOICE AGENT CLASS
 # =============================================================================
@@ -293,9 +598,16 @@ class FeedbackVoiceAgent(VoiceAgent):
         self.ctx = ctx
         self.greeting_sent = False
     
+    def _say_cached(self, text: str, allow_interruptions: bool = True):
+        """Speak text, replaying pre-synthesized audio when it is cached"""
+        frames = TTS_CACHE.get(text)
+        if frames is None:
+            return self.session.say(text, allow_interruptions=allow_interruptions)
+        return self.session.say(text, audio=replay_frames(frames), allow_interruptions=allow_interruptions)
+    
     def on_enter(self):
         """Called when agent enters/starts"""
-        print("🎤 Agent is ready and listening...")
+        logger.info("🎤 Agent is ready and listening...")
         
         # Schedule greeting to be sent
         if not self.greeting_sent:
@@ -304,154 +616,193 @@ class FeedbackVoiceAgent(VoiceAgent):
     async def _send_greeting(self):
         """Send the initial greeting"""
         await asyncio.sleep(0.5)
-        greeting = self.state.get_greeting()
-        self.state.add_to_transcript("Riya", greeting)
+        state = self.state
+        if state is None:
+            return
+        greeting = state.get_greeting()
+        state.add_to_transcript("Riya", greeting)
         # Use the session property from parent Agent class
-        await self.session.say(greeting, allow_interruptions=True)
-        print(f"Riya: {greeting}")
+        await self._say_cached(greeting, allow_interruptions=True)
+        logger.debug("Riya: %s", greeting)
         self.greeting_sent = True
     
-    def on_user_turn_completed(self, turn_ctx: ChatContext, new_message: ChatMessage):
+    async def on_user_turn_completed(self, turn_ctx: ChatContext, new_message: ChatMessage):
         """
         Called when user completes their turn (finishes speaking).
         This is where we process user responses and drive the conversation.
         """
         # Schedule async processing
         asyncio.create_task(self._process_user_response(new_message))
+        # Each question already opens with its acknowledgment ("Theek hai.", "Achha.", ...),
+        # so skip the default LLM reply for this turn
+        raise StopResponse()
     
     async def _process_user_response(self, new_message: ChatMessage):
         """Process user response asynchronously"""
+        # Work on a local reference - self.state is cleared once the call is saved,
+        # and other turn tasks may finish the call while this one awaits
+        state = self.state
+        # Ignore speech after the call has ended
+        if state is None or state.conversation_complete:
+            return
+        
         # Extract user's text from the message (handle both string and list)
-        if isinstance(new_message.content, list):
-            # Content is a list of strings - join them
-            user_text = ' '.join(str(item) for item in new_message.content)
-        elif isinstance(new_message.content, str):
-            user_text = new_message.content
-        else:
-            user_text = str(new_message.content)
-        print(f"👤 User said: {user_text}")
+        user_text = content_to_text(new_message.content).strip()
+        logger.debug("👤 User said: %s", user_text)
+        
+        # Nothing usable was heard (empty or punctuation only)
+        heard = WORD_CHAR_PATTERN.search(user_text) is not None
+        if heard:
+            # Add to transcript
+            state.add_to_transcript("User", user_text)
         
-        # Add to transcript
-        self.state.add_to_transcript("User", user_text)
+        # STT was unsure of what it heard
+        confidence = getattr(new_message, "transcript_confidence", None)
+        low_confidence = confidence is not None and confidence < MIN_TRANSCRIPT_CONFIDENCE
+        
+        # Ask again without advancing, up to MAX_RETRIES times per question
+        if not heard or low_confidence:
+            if state.retry_count < MAX_RETRIES:
+                state.retry_count += 1
+                logger.debug("🔁 Asking to repeat (confidence: %s)", confidence)
+                await self._ask_to_repeat(state)
+                return
+            logger.debug("🔁 Retry limit reached, using the answer as heard")
         
         # If greeting phase (waiting for user to agree to give feedback)
-        if self.state.current_question_index == -1:
+        if state.current_question_index == -1:
             # Check if user agrees (both Devanagari and romanized Hinglish)
-            agree_words = [
-                'haan', 'han', 'haa', 'yes', 'yeah', 'yep', 'yup',
-                'bilkul', 'bilkool', 'sure', 'ok', 'okay',
-                'theek', 'thik', 'ha', 'ji', 'jee',
-                'हां', 'हाँ', 'जी', 'बिल्कुल', 'ठीक', 'अच्छा'  # Devanagari
-            ]
-            if any(word in user_text.lower() or word in user_text for word in agree_words):
+            if AnswerExtractor.extract_agreement(user_text):
                 # Move to first question
-                self.state.move_to_next_question()
-                question = self.state.get_current_question()
-                self.state.add_to_transcript("Riya", question)
-                await self.session.say(question, allow_interruptions=True)
-                print(f"🤖 Riya asked: {question}")
+                state.move_to_next_question()
+                question = state.get_current_question()
+                state.add_to_transcript("Riya", question)
+                await self._say_cached(question, allow_interruptions=True)
+                logger.debug("🤖 Riya asked: %s", question)
             else:
-                # User declined
-                farewell = "Koi baat nahi, phir kabhi. Dhanyavaad!"
-                self.state.add_to_transcript("Riya", farewell)
-                await self.session.say(farewell, allow_interruptions=False)
-                await self._save_and_exit()
+                # User declined, or was never heard - mark complete before awaiting
+                # so no other turn also saves
+                state.conversation_complete = True
+                farewell = state.FAREWELL_DECLINED if heard else state.FAREWELL_NO_RESPONSE
+                state.add_to_transcript("Riya", farewell)
+                await self._say_cached(farewell, allow_interruptions=False)
+                await self._save_and_exit(state)
             return
         
         # Process answer based on question type
-        question_type = self.state.get_current_question_type()
-        
-        if question_type == "rating_1_5":
-            # Extract rating (1-5)
-            rating = AnswerExtractor.extract_rating(user_text)
-            self.state.store_answer(rating)
-            print(f"⭐ Extracted rating: {rating}")
-            
-        elif question_type == "yes_no":
-            # Extract yes/no
-            yes_no = AnswerExtractor.extract_yes_no(user_text)
-            self.state.store_answer(yes_no)
-            print(f"✓/✗ Extracted yes/no: {yes_no}")
-            
-        elif question_type == "free_text":
-            # Store as-is
-            comment = AnswerExtractor.extract_free_text(user_text)
-            self.state.store_answer(comment)
-            print(f"💬 Extracted comment: {comment}")
+        extractor = ANSWER_EXTRACTORS.get(state.get_current_question_type())
+        if extractor:
+            answer = extractor(user_text)
+            state.store_answer(answer)
+            logger.debug("📝 Extracted answer: %s", answer)
         
-        # Move to next question or finish
-        has_more = self.state.move_to_next_question()
+        # Move to next question or finish (sets conversation_complete after the last one)
+        has_more = state.move_to_next_question()
         
         if has_more:
             # Ask next question
-            question = self.state.get_current_question()
-            self.state.add_to_transcript("Riya", question)
-            await self.session.say(question, allow_interruptions=True)
-            print(f"🤖 Riya asked: {question}")
+            question = state.get_current_question()
+            state.add_to_transcript("Riya", question)
+            await self._say_cached(question, allow_interruptions=True)
+            logger.debug("🤖 Riya asked: %s", question)
         else:
             # All questions done - Thank and save
-            farewell = "Bahut bahut dhanyavaad aapka feedback dene ke liye! Aap ka din shubh rahe!"
-            self.state.add_to_transcript("Riya", farewell)
-            await self.session.say(farewell, allow_interruptions=False)
-            print(f"🤖 Riya: {farewell}")
+            farewell = state.FAREWELL_COMPLETE
+            state.add_to_transcript("Riya", farewell)
+            await self._say_cached(farewell, allow_interruptions=False)
+            logger.debug("🤖 Riya: %s", farewell)
             
             # Save transcript and JSON, then auto-disconnect
-            await self._save_and_exit(auto_disconnect=True)
+            await self._save_and_exit(state, auto_disconnect=True)
+    
+    async def _ask_to_repeat(self, state: ConversationState):
+        """Ask the user to repeat, keeping the current question"""
+        retry = state.RETRY_PROMPT
+        state.add_to_transcript("Riya", retry)
+        await self._say_cached(retry, allow_interruptions=True)
     
     def on_exit(self):
         """Called when agent exits"""
-        print("👋 Agent session ended")
+        logger.info("👋 Agent session ended")
     
-    async def _save_and_exit(self, auto_disconnect=False):
+    async def _save_and_exit(self, state: ConversationState, auto_disconnect=False):
         """Save transcript and JSON, then optionally disconnect"""
-        print("\n" + "="*60)
-        print("💾 SAVING OUTPUTS...")
-        print("="*60)
+        logger.info("💾 SAVING OUTPUTS...")
         
-        # Save transcript
-        transcript_path = OutputManager.save_transcript(self.state.call_id, self.state.transcript)
-        print(f"✅ Transcript saved: {transcript_path}")
+        # Both files share one timestamp
+        call_id = state.call_id
+        timestamp = OutputManager.get_timestamp()
+        
+        # Write transcript and JSON concurrently off the event loop
+        transcript_path, json_path = await asyncio.gather(
+            asyncio.to_thread(
+                OutputManager.save_transcript, call_id,
+                state.transcript_speakers, state.transcript_texts, timestamp,
+            ),
+            asyncio.to_thread(
+                OutputManager.save_json, call_id, state.answers,
+                OutputManager.get_transcript_path(call_id), timestamp,
+            ),
+        )
+        logger.info("✅ Transcript saved: %s", transcript_path)
+        logger.info("✅ JSON saved: %s", json_path)
         
-        # Save JSON
-        json_path = OutputManager.save_json(self.state.call_id, self.state.answers, transcript_path)
-        print(f"✅ JSON saved: {json_path}")
+        logger.info("📊 FINAL ANSWERS:")
+        for key, value in state.answers.items():
+            logger.info("  %s: %s", key, value)
         
-        print("\n📊 FINAL ANSWERS:")
-        for key, value in self.state.answers.items():
-            print(f"  {key}: {value}")
+        # Outputs are written - hand the state back for the next call
+        self.state = None
+        state.release()
         
-        print("\n" + "="*60)
-        print("✅ Conversation complete!")
-        print("="*60)
+        logger.info("✅ Conversation complete!")
         
         # Auto-disconnect if requested (after survey completion)
         if auto_disconnect:
-            print("👋 Auto-disconnecting in 1 second...")
+            logger.info("👋 Auto-disconnecting in 1 second...")
             await asyncio.sleep(1)  # Short delay to ensure final message is sent
             await self.ctx.room.disconnect()
-            print("🔌 Session closed")
+            logger.info("🔌 Session closed")
 
 
 # =============================================================================
 # ENTRY POINT FUNCTION
 # =============================================================================
 
+# Static agent persona - kept byte-identical across sessions and free of per-call
+# data so any model attached to the session can reuse its cached prompt prefix
+AGENT_INSTRUCTIONS = """You are Riya, a friendly customer service agent from TVS service center.
+You speak naturally in Hinglish (Hindi + English mix).
+Keep responses very short and conversational.
+You are collecting feedback. Just acknowledge what the user says naturally.
+Examples: "Theek hai", "Samajh gayi", "Bilkul", "Achha", "Thank you"
+IMPORTANT: Never ask questions yourself. Only give acknowledgments."""
+
+
+def prewarm(proc: JobProcess):
+    """Set up logging and fill the prompt audio cache once per worker process"""
+    setup_log_queue()
+    
+    # Pre-synthesize the fixed prompts before this process is handed a call
+    try:
+        asyncio.run(asyncio.wait_for(warm_tts_cache(), TTS_WARM_TIMEOUT))
+    except asyncio.TimeoutError:
+        logger.warning("⚠️ Prompt pre-synthesis timed out, uncached prompts use live TTS")
+    except Exception as e:
+        # e.g. missing ElevenLabs credentials - never fail process initialization over this
+        logger.warning("⚠️ Prompt pre-synthesis failed, uncached prompts use live TTS: %s", e)
+
+
 async def entrypoint(ctx: JobContext):
     """Main entry point for LiveKit agent"""
     
     # Connect to the room
     await ctx.connect()
-    print(f"✅ Connected to room: {ctx.room.name}")
+    logger.info("✅ Connected to room: %s", ctx.room.name)
     
     # Initialize conversation state
-    state = ConversationState()
-    print(f"📞 Call ID: {state.call_id}")
-    
-    # Configure LLM (OpenAI GPT-4)
-    llm_model = openai.LLM(
-        model="gpt-4",
-        temperature=0.7,
-    )
+    state = ConversationState.acquire()
+    logger.info("📞 Call ID: %s", state.call_id)
     
     # Configure STT (Deepgram with Hindi language for better Hinglish recognition)
     # Using "hi" (Hindi) model which better transcribes Hindi words like "haan", "nahi", "paanch"
@@ -464,16 +815,11 @@ async def entrypoint(ctx: JobContext):
         filler_words=True,  # Capture filler words
     )
     
-    # Configure TTS (ElevenLabs with female voice - Bella for better punctuation)
-    tts = elevenlabs.TTS(
-        voice_id="EXAVITQu4vr4xnSDxMaL",  # Bella - Soft female voice with clear pronunciation
-        model="eleven_turbo_v2_5",
-    )
+    tts = create_tts()
     
-    # Create agent session with STT, LLM, TTS configuration
+    # Create agent session with STT and TTS only - every reply is scripted
     session = voice.AgentSession(
         stt=stt,
-        llm=llm_model,
         tts=tts,
         allow_interruptions=True,
     )
@@ -482,12 +828,7 @@ async def entrypoint(ctx: JobContext):
     assistant = FeedbackVoiceAgent(
         state=state,
         ctx=ctx,
-        instructions="""You are Riya, a friendly customer service agent from TVS service center.
-You speak naturally in Hinglish (Hindi + English mix).
-Keep responses very short and conversational.
-You are collecting feedback. Just acknowledge what the user says naturally.
-Examples: "Theek hai", "Samajh gayi", "Bilkul", "Achha", "Thank you"
-IMPORTANT: Never ask questions yourself. Only give acknowledgments.""",
+        instructions=AGENT_INSTRUCTIONS,
     )
     
     # Start the agent session with the room
@@ -502,5 +843,6 @@ if __name__ == "__main__":
     cli.run_app(
         WorkerOptions(
             entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm,
         )
     )
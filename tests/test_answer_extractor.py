@@ -0,0 +1,84 @@
+"""Table-driven checks for AnswerExtractor"""
+
+import pytest
+
+pytest.importorskip("livekit.agents")
+
+from agent import AnswerExtractor
+
+
+@pytest.mark.parametrize("text, expected", [
+    # Digits and number words, with the punctuation Deepgram adds
+    ("5", 5),
+    ("5.", 5),
+    ("4.", 4),
+    ("4, ", 4),
+    ("Rating 5!", 5),
+    ("Main 4 dunga", 4),
+    ("5 out of 5", 5),
+    ("paanch", 5),
+    ("Teen.", 3),
+    ("chaar", 4),
+    ("पांच", 5),
+    ("तीन,", 3),
+    # A real number later in the sentence wins over filler words
+    ("to be honest, paanch.", 5),
+    # Phonetic variations
+    ("tein", 3),
+    ("chr", 4),
+    ("tean", 3),
+    # Short filler words are not ratings
+    ("ok", 0),
+    ("ke", 0),
+    ("hello world", 0),
+    # Two-letter number words inside common words are not ratings
+    ("theek tha", 0),
+    ("sab theek hai", 0),
+    ("dono achhe the", 0),
+    ("door tha", 0),
+    ("Actually not sure", 0),
+])
+def test_extract_rating(text, expected):
+    assert AnswerExtractor.extract_rating(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Haan bilkul", True),
+    ("Achha", True),
+    ("accha theek hai", True),
+    ("हां,", True),
+    ("OK", True),
+    ("Haan, koi problem nahi", True),
+    ("Nahi, abhi busy hoon", False),
+    ("No thanks", False),
+    ("bilkul nahi", False),
+    ("Ji nahi", False),
+    ("जी नहीं", False),
+    ("abhi busy hoon", False),
+])
+def test_extract_agreement(text, expected):
+    assert AnswerExtractor.extract_agreement(text) is expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Haan", "yes"),
+    ("हां,", "yes"),
+    ("Haan, theek thi", "yes"),
+    ("haanji", "yes"),
+    ("Nope", "no"),
+    ("No.", "no"),
+    ("Na.", "no"),
+    ("नहीं", "no"),
+    ("bilkul nahi", "no"),
+    ("ji nahi", "no"),
+    ("Ji nahin.", "no"),
+    ("जी नहीं", "no"),
+    ("बिल्कुल नहीं", "no"),
+    # The earliest indicator decides
+    ("haan nahi", "yes"),
+    # Keywords must start a word ("chaar" contains "haa")
+    ("chaar", "unknown"),
+    ("एक घंटा late delay हुआ था.", "unknown"),
+])
+def test_extract_yes_no(text, expected):
+    assert AnswerExtractor.extract_yes_no(text) == expected
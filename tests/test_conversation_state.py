@@ -0,0 +1,45 @@
+"""Checks for ConversationState bookkeeping"""
+
+import pytest
+
+pytest.importorskip("livekit.agents")
+
+from agent import ConversationState
+
+
+def test_release_resets_state_for_reuse():
+    state = ConversationState.acquire()
+    first_call_id = state.call_id
+    state.move_to_next_question()
+    state.store_answer(4)
+    state.add_to_transcript("User", "chaar")
+    state.retry_count = 1
+    state.conversation_complete = True
+    state.release()
+
+    reused = ConversationState.acquire()
+    assert reused is state
+    assert reused.call_id != first_call_id
+    assert reused.current_question_index == -1
+    assert reused.answers == ConversationState.DEFAULT_ANSWERS
+    assert reused.transcript_speakers == []
+    assert reused.transcript_texts == []
+    assert reused.conversation_complete is False
+    assert reused.retry_count == 0
+
+
+def test_acquire_with_empty_pool_creates_state():
+    ConversationState._POOL.clear()
+    state = ConversationState.acquire()
+    assert state.current_question_index == -1
+    assert state.answers == ConversationState.DEFAULT_ANSWERS
+
+
+def test_move_to_next_question_resets_retry_count():
+    state = ConversationState()
+    state.retry_count = 2
+    assert state.move_to_next_question()
+    assert state.retry_count == 0
+    state.retry_count = 1
+    state.move_to_next_question()
+    assert state.retry_count == 0